@@ -1,5 +1,8 @@
 def say_hello(name: str) -> str:
     return f"Hello, {name}!"
 
-if __name__ == "__main__":
+def main() -> None:
     print(say_hello("World"))
+
+if __name__ == "__main__":
+    main()
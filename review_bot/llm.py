@@ -1,7 +1,10 @@
 # llm.py
-import os
-from typing import List, Dict
-from langchain_openai import AzureChatOpenAI
+import io, os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:  # imported lazily in make_llm(): early-exit runs never pay for langchain
+    from langchain_openai import AzureChatOpenAI
 
 SYSTEM = (
     "You are a senior Python code reviewer.\n"
@@ -13,7 +16,11 @@ SYSTEM = (
     "If no issues, say so for that file.\n"
 )
 
-def make_llm() -> AzureChatOpenAI:
+# one review call per MAX_PROMPT_CHARS of prompt (~4 chars/token): a single call for any normal PR,
+# split only when the files wouldn't fit the model's context window together
+MAX_PROMPT_CHARS = int(os.getenv("REVIEW_MAX_PROMPT_CHARS", "360000"))
+
+def make_llm() -> "AzureChatOpenAI":
     """
     Reads standard Azure OpenAI env vars (set in the workflow):
     - AZURE_OPENAI_API_KEY
@@ -21,6 +28,7 @@ def make_llm() -> AzureChatOpenAI:
     - AZURE_OPENAI_API_VERSION
     - AZURE_OPENAI_DEPLOYMENT
     """
+    from langchain_openai import AzureChatOpenAI
     # LangChain picks these up from env automatically; no hardcoding here.
     return AzureChatOpenAI(
         azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
@@ -31,32 +39,53 @@ def make_llm() -> AzureChatOpenAI:
         streaming=False,
     )
 
+def _file_block(f: Dict) -> str:
+    buf = io.StringIO(); w = buf.write
+    w(f"\n## {f['path']} ({f.get('status','')})\n")
+    if f.get("patch"):
+        w("\n```diff\n"); w(f["patch"][:20000]); w("\n```")
+    if f.get("content"):
+        w(f"\n\n<current file snapshot: {f['path']}>\n```python\n"); w(f["content"][:20000]); w("\n```\n")
+    return buf.getvalue()
+
 def build_prompt(spec_text: str, files: List[Dict]) -> str:
-    parts = []
-    parts.append("# SPEC (from Confluence)\n")
-    parts.append(spec_text.strip()[:20000])
-    parts.append("\n\n# CHANGED FILES (unified diffs + snapshots)\n")
-    for f in files:
-        parts.append(f"## {f['path']} ({f.get('status','')})\n")
-        if f.get("patch"):
-            parts.append("```diff\n" + f["patch"][:20000] + "\n```")
-        if f.get("content"):
-            parts.append(f"\n<current file snapshot: {f['path']}>\n```python\n{f['content'][:20000]}\n```\n")
-    parts.append(
-        "\n# Review Task\n"
+    # one growing buffer instead of a parts list + final join; slices only copy when they truncate
+    buf = io.StringIO(); w = buf.write
+    w("# SPEC (from Confluence)\n\n")
+    w(spec_text.strip()[:20000])
+    w("\n\n\n# CHANGED FILES (unified diffs + snapshots)\n")
+    for f in files: w(_file_block(f))
+    w(
+        "\n\n# Review Task\n"
         "- For each file, list issues as bullets.\n"
         "- Cite SPEC when applicable.\n"
         "- Provide **GitHub suggestion blocks** for exact replacements.\n"
         "- Keep suggestions minimal and safe.\n"
         "- Output markdown.\n"
     )
-    return "\n".join(parts)
+    return buf.getvalue()
+
+def pack_files(spec_text: str, files: List[Dict]) -> List[List[Dict]]:
+    """Files in order, greedily packed into as few prompts as fit MAX_PROMPT_CHARS (a file too big alone gets its own)."""
+    room = MAX_PROMPT_CHARS - len(build_prompt(spec_text, []))
+    batches, cur, used = [], [], 0
+    for f in files:
+        n = len(_file_block(f))
+        if cur and used + n > room:
+            batches.append(cur); cur, used = [], 0
+        cur.append(f); used += n
+    batches.append(cur)   # never empty unless there were no files at all
+    return batches
 
 def review(spec_text: str, files: List[Dict]) -> str:
     llm = make_llm()
-    prompt = build_prompt(spec_text, files)
-    resp = llm.invoke([
-        {"role": "system", "content": SYSTEM},
-        {"role": "user", "content": prompt}
-    ])
-    return getattr(resp, "content", str(resp))
+    def one(batch: List[Dict]) -> str:
+        resp = llm.invoke([
+            {"role": "system", "content": SYSTEM},
+            {"role": "user", "content": build_prompt(spec_text, batch)}
+        ])
+        return getattr(resp, "content", str(resp))
+    batches = pack_files(spec_text, files)
+    if len(batches) == 1: return one(batches[0])
+    with ThreadPoolExecutor(max_workers=min(4, len(batches))) as ex:
+        return "\n\n".join(ex.map(one, batches))
@@ -1,80 +1,318 @@
 # review_bot/main.py
-import os, re, html, json, base64, requests
+import os, re, html, json, time, base64, bisect, random, hashlib, functools, threading, contextlib, requests
+from collections import OrderedDict
 from typing import List, Dict, Tuple, Optional
+from urllib.parse import urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, wait
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from .llm import review, make_llm  # review() for whole-PR pass, make_llm() for per-section fallback
 
+try:  # optional C JSON codec; stdlib json is the fallback
+    import orjson
+    _loads, _dumps = orjson.loads, orjson.dumps
+except ImportError:
+    _loads, _dumps = json.loads, lambda o: json.dumps(o).encode()
+
+# ---------- HTTP session ----------
+# Pooled keep-alive sessions reuse TCP/TLS connections instead of a fresh handshake per request.
+FETCH_WORKERS = 8   # concurrent content batches; small enough to stay clear of GitHub's abuse limits
+GH_RETRIES = 3                                   # extra attempts after the first one
+GH_RETRY_STATUS = (429, 500, 502, 503, 504)
+RETRY_AFTER_CAP = 60.0                           # longest Retry-After slept through, by urllib3 and _backoff alike
+POST_WORKERS = 6    # concurrent comment POSTs in the per-comment fallback
+_GH_WRITES = threading.Semaphore(POST_WORKERS)   # caps in-flight write=True requests (secondary rate limit targets concurrent writes)
+
+class _CappedRetry(Retry):
+    """urllib3 Retry that honours Retry-After up to RETRY_AFTER_CAP instead of sleeping however long a server asks."""
+    def get_retry_after(self, response) -> Optional[float]:
+        ra = super().get_retry_after(response)
+        return None if ra is None else min(ra, RETRY_AFTER_CAP)
+
+def _session() -> requests.Session:
+    s = requests.Session()
+    # Idempotent GETs (raw files, Confluence, API reads) are retried by urllib3 itself, honouring a capped Retry-After;
+    # the final response is handed back (raise_on_status=False) so callers keep their own error handling.
+    s.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                                    max_retries=_CappedRetry(total=GH_RETRIES, backoff_factor=0.3, status_forcelist=GH_RETRY_STATUS,
+                                                             allowed_methods=frozenset({"GET"}), raise_on_status=False)))
+    return s
+
+_S = _session()   # raw.githubusercontent + Confluence: no GitHub credentials attached
+API = "https://api.github.com"
+
+@functools.lru_cache(maxsize=1)
+def _gh_session() -> requests.Session:
+    """api.github.com session with auth/Accept as defaults, built once; kept apart from _S so the token never leaves GitHub."""
+    tok = os.getenv("GITHUB_TOKEN");  assert tok, "GITHUB_TOKEN missing."
+    s = _session();  s.headers.update({"Authorization": f"Bearer {tok}", "Accept": "application/vnd.github+json"})
+    return s
+
 # ---------- tiny GitHub helpers ----------
+def _backoff(attempt: int, r: Optional[requests.Response] = None) -> float:
+    """Seconds to wait before retry #attempt: Retry-After when GitHub sends it, else capped exp. backoff + jitter."""
+    ra = r.headers.get("Retry-After", "") if r is not None else ""
+    if ra.isdigit(): return min(RETRY_AFTER_CAP, float(ra))
+    return min(30.0, 1.0 * 2**attempt) * (1 + random.random() * 0.5)
+
+class GitHubError(SystemExit):
+    """A failed GitHub call. Still a SystemExit, so uncaught it ends the run like before; `status_code` is None
+    when no response came back (connection error, timeout)."""
+    def __init__(self, msg: str, status_code: Optional[int] = None):
+        super().__init__(msg);  self.status_code = status_code
+
+def _retryable(r: requests.Response, method: str, write: bool) -> bool:
+    # 429 and a 403 carrying Retry-After (GitHub's secondary rate limit, which urllib3 doesn't know about) are refusals:
+    # nothing was done, so even a write may go again. A 5xx on a write may come after GitHub already created the
+    # review/comment, so only reads (GraphQL POSTs included) repeat on those; GETs already went through the adapter's retries.
+    if r.status_code == 403 and "Retry-After" in r.headers: return True
+    if method == "GET": return False
+    return r.status_code == 429 or (not write and r.status_code in GH_RETRY_STATUS)
+
+def _gh_response(path: str, method: str = "GET", write: bool = False, **kw) -> requests.Response:
+    """`write=True` marks requests that create something on GitHub (reviews, comments): never repeated once they may have landed."""
+    if "json" in kw:  # auth/Accept live on the session; only JSON bodies add a header of their own
+        kw["data"] = _dumps(kw.pop("json"));  kw["headers"] = {**kw.get("headers", {}), "Content-Type": "application/json"}
+    url = API + path
+    for attempt in range(GH_RETRIES + 1):
+        try:
+            with (_GH_WRITES if write else contextlib.nullcontext()):  # slot held for the request only, not the backoff
+                r = _gh_session().request(method, url, timeout=30, **kw)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            # a write goes again only if it provably never reached GitHub (connect timeout); a read timeout may hide a success
+            maybe_sent = write and not isinstance(e, requests.ConnectTimeout)
+            if method == "GET" or maybe_sent or attempt == GH_RETRIES: raise GitHubError(f"GitHub {method} {path}: {e}")
+            time.sleep(_backoff(attempt)); continue
+        if attempt < GH_RETRIES and _retryable(r, method, write):
+            print(f"[bot] GitHub {method} {path}: {r.status_code}, retry {attempt+1}/{GH_RETRIES}")
+            time.sleep(_backoff(attempt, r)); continue
+        break
+    if r.status_code >= 400: raise GitHubError(f"GitHub {method} {path}: {r.status_code} {r.text[:400]}", r.status_code)
+    return r
+
 def gh(path: str, method: str = "GET", **kw):
-    tok = os.getenv("GITHUB_TOKEN");  assert tok, "GITHUB_TOKEN missing."
-    hdr = kw.pop("headers", {});  hdr.update({"Authorization": f"Bearer {tok}", "Accept": "application/vnd.github+json"})
-    r = requests.request(method, f"https://api.github.com{path}", headers=hdr, timeout=30, **kw)
-    if r.status_code >= 400: raise SystemExit(f"GitHub {method} {path}: {r.status_code} {r.text[:400]}")
-    return r.json()
+    return _loads(_gh_response(path, method, **kw).content)
 
+def gh_pages(path: str) -> List:
+    """Every item of a paginated list endpoint: page 1 tells us the last page (Link header), the rest load concurrently."""
+    path += ("&" if "?" in path else "?") + "per_page=100"
+    first = _gh_response(path)
+    items, last = _loads(first.content), first.links.get("last", {}).get("url")
+    if not last: return items
+    n = int(parse_qs(urlparse(last).query)["page"][0])
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as ex:
+        for page in ex.map(lambda p: gh(f"{path}&page={p}"), range(2, n + 1)): items.extend(page)
+    return items
+
+def gh_graphql(query: str, variables: Dict) -> Dict:
+    js = gh("/graphql", method="POST", json={"query": query, "variables": variables})
+    if not js.get("data"): raise SystemExit(f"GitHub GraphQL: {str(js.get('errors'))[:400]}")
+    return js["data"]
+
+@functools.lru_cache(maxsize=1)   # the event file never changes during a run: read and parse it once
 def pr_ctx() -> Tuple[str, str, int, str]:
     owner, repo = os.getenv("GITHUB_REPOSITORY","").split("/",1)
-    with open(os.getenv("GITHUB_EVENT_PATH"), "r", encoding="utf-8") as f: evt = json.load(f)
+    with open(os.getenv("GITHUB_EVENT_PATH"), "rb") as f: evt = _loads(f.read())
     pr = evt["pull_request"];  return owner, repo, pr["number"], pr["head"]["sha"]
 
 # ---------- Confluence ----------
+def _strip_html(s: str) -> str:
+    """Single pass over storage HTML: drop tags, turn </p> and <br> into newlines."""
+    out, i = [], 0
+    while True:
+        j = s.find("<", i)
+        if j < 0: out.append(s[i:]); break
+        k = s.find(">", j + 1)
+        if k < 0: out.append(s[i:]); break          # unterminated tag: keep the tail as text
+        out.append(s[i:j])
+        if k == j + 1: out.append("<>")              # "<>" is not a tag
+        else:
+            tag = s[j+1:k].lower()
+            if tag == "/p" or tag.removesuffix("/").rstrip() == "br": out.append("\n")
+        i = k + 1
+    return html.unescape("".join(out)).strip()
+
+CACHE_DIR = os.path.expanduser(os.getenv("REVIEW_BOT_CACHE_DIR") or "~/.cache/review_bot")   # persisted between runs by actions/cache
+
+def _spec_cache_path(url: str) -> str:
+    return os.path.join(CACHE_DIR, f"spec-{hashlib.sha1(url.encode()).hexdigest()}.json")
+
 def fetch_spec() -> str:
     url, user, token = os.getenv("CONF_URL"), os.getenv("CONF_USERNAME"), os.getenv("CONF_API")
     if not (url and user and token): raise SystemExit("Missing CONF_URL / CONF_USERNAME / CONF_API.")
-    r = requests.get(url, auth=(user, token), timeout=30); r.raise_for_status()
-    js = r.json(); html_body = (((js or {}).get("body") or {}).get("storage") or {}).get("value") or ""
-    if not html_body: return json.dumps(js, indent=2)
-    t = re.sub(r"</p>", "\n", html_body, flags=re.I); t = re.sub(r"<br\s*/?>", "\n", t, flags=re.I); t = re.sub(r"<[^>]+>", "", t)
-    return html.unescape(t).strip()
+    path = _spec_cache_path(url)
+    try:
+        with open(path, "rb") as f: cached = _loads(f.read())
+    except (OSError, ValueError): cached = {}
+    # conditional GET: an unchanged page comes back as an empty 304 and skips the HTML strip
+    hdr = {}
+    if cached.get("etag"): hdr["If-None-Match"] = cached["etag"]
+    if cached.get("last_modified"): hdr["If-Modified-Since"] = cached["last_modified"]
+    r = _S.get(url, auth=(user, token), headers=hdr, timeout=30)
+    if r.status_code == 304 and "text" in cached: return cached["text"]
+    r.raise_for_status()
+    js = _loads(r.content) or {}
+    version = (js.get("version") or {}).get("number")
+    # servers without validators still tell us the page version: same version -> same text
+    if version is not None and version == cached.get("version") and "text" in cached: return cached["text"]
+    html_body = ((js.get("body") or {}).get("storage") or {}).get("value") or ""
+    text = _strip_html(html_body) if html_body else json.dumps(js, indent=2)
+    entry = {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified"), "version": version, "text": text}
+    if entry["etag"] or entry["last_modified"] or version is not None:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(path, "wb") as f: f.write(_dumps(entry))
+        except OSError as e:
+            print(f"[bot] could not cache spec: {e}")
+    return text
 
 # ---------- files / diffs ----------
+_content_memo: Dict[Tuple, str] = {}
+
 def fetch_content(owner: str, repo: str, path: str, ref: str, raw_url: Optional[str]) -> str:
+    """File text at `ref`, downloaded once per run. Only successes are memoized: "" may be a transient failure."""
+    key = (owner, repo, path, ref, raw_url)
+    if key in _content_memo: return _content_memo[key]
+    text = _download_content(owner, repo, path, ref, raw_url)
+    if text: _content_memo[key] = text
+    return text
+
+def _download_content(owner: str, repo: str, path: str, ref: str, raw_url: Optional[str]) -> str:
     if raw_url:
-        rr = requests.get(raw_url, timeout=30)
-        if rr.ok: return rr.text
-    r = requests.get(f"https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={ref}",
-                     headers={"Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}", "Accept": "application/vnd.github.raw"},
-                     timeout=30)
-    if r.ok and r.text: return r.text
-    r = requests.get(f"https://api.github.com/repos/{owner}/{repo}/contents/{path}?ref={ref}",
-                     headers={"Authorization": f"Bearer {os.getenv('GITHUB_TOKEN')}"},
-                     timeout=30)
-    if r.ok:
-        js = r.json()
-        if isinstance(js, dict) and js.get("encoding") == "base64":
-            return base64.b64decode(js.get("content","")).decode("utf-8","ignore")
+        rr = _S.get(raw_url, timeout=30)
+        if rr.ok: return rr.content.decode("utf-8","ignore")   # explicit decode: .text may run charset detection
+    # one contents call: raw body when GitHub honours the media type, else decode the base64 JSON it sent instead
+    r = _gh_session().get(f"{API}/repos/{owner}/{repo}/contents/{path}?ref={ref}",
+                          headers={"Accept": "application/vnd.github.raw"}, timeout=30)
+    if not r.ok: return ""
+    if not r.headers.get("Content-Type", "").startswith("application/json"): return r.content.decode("utf-8","ignore")
+    js = _loads(r.content)
+    if isinstance(js, dict) and js.get("encoding") == "base64":
+        return base64.b64decode(js.get("content","")).decode("utf-8","ignore")
     return ""
 
-def changed_py_files(owner: str, repo: str, pr_number: int, head_sha: str) -> List[Dict]:
-    files = gh(f"/repos/{owner}/{repo}/pulls/{pr_number}/files")
-    out = []
+BLOB_BATCH = 50   # file blobs aliased into one GraphQL query
+
+def fetch_blobs(owner: str, repo: str, ref: str, paths: List[str]) -> Dict[str, Optional[str]]:
+    """Texts of `paths` at `ref` in one GraphQL round trip; None where GraphQL can't serve it (missing, binary, >1MB truncated)."""
+    decl = "".join(f", $e{i}: String!" for i in range(len(paths)))
+    sel = " ".join(f"f{i}: object(expression: $e{i}) {{ ... on Blob {{ text isBinary isTruncated }} }}" for i in range(len(paths)))
+    q = f"query($owner: String!, $name: String!{decl}) {{ repository(owner: $owner, name: $name) {{ {sel} }} }}"
+    var = {"owner": owner, "name": repo, **{f"e{i}": f"{ref}:{p}" for i, p in enumerate(paths)}}
+    got = gh_graphql(q, var).get("repository") or {}
+    out = {}
+    for i, p in enumerate(paths):
+        b = got.get(f"f{i}") or {}
+        out[p] = None if (b.get("isBinary") or b.get("isTruncated")) else b.get("text")
+    return out
+
+def changed_py_files(owner: str, repo: str, pr_number: int) -> List[Dict]:
+    """PR .py files with patch + diff ranges; contents are fetched separately by start_content_fetch()."""
+    files = gh_pages(f"/repos/{owner}/{repo}/pulls/{pr_number}/files")  # default page size silently capped PRs at 30 files
+    out = [{"path": f["filename"],
+            "patch": f.get("patch") or "",
+            "raw_url": f.get("raw_url"),
+            "status": f.get("status",""),
+            "additions": f.get("additions", 0)}
+           for f in files if f["filename"].endswith(".py")]
+    for item in out: item["ranges"] = diff_ranges(item["patch"])  # parsed once, reused downstream
+    return out
+
+def content_from_patch(patch: str) -> Optional[str]:
+    """Text of a newly added file rebuilt from its patch (one '@@ -0,0 +1,N @@' hunk of '+' lines); None if it doesn't add up."""
+    m = HUNK.match(patch)
+    if not m or not patch.startswith("@@ -0,0 ") or m.group(1) != "1": return None
+    body, eol = patch.split("\n")[1:], "\n"
+    if body and body[-1] == "": body.pop()
+    if body and body[-1].startswith("\\"): body.pop();  eol = ""   # "\ No newline at end of file"
+    if len(body) != int(m.group(2) or 1) or not all(l.startswith("+") for l in body): return None
+    return "\n".join(l[1:] for l in body) + eol
+
+def start_content_fetch(ex: ThreadPoolExecutor, owner: str, repo: str, head_sha: str, files: List[Dict]) -> List[Future]:
+    """Download contents concurrently, BLOB_BATCH files per GraphQL call; each future resolves to
+    its batch of items once item["content"] is filled in (REST fallback for blobs GraphQL can't serve).
+    Added files need no download: their patch already is the whole file."""
+    local, remote = [], []
     for f in files:
-        if f["filename"].endswith(".py"):
-            p = f["filename"]
-            out.append({"path": p,
-                        "patch": f.get("patch") or "",
-                        "raw_url": f.get("raw_url"),
-                        "status": f.get("status",""),
-                        "content": fetch_content(owner, repo, p, head_sha, f.get("raw_url"))})
+        t = content_from_patch(f["patch"]) if f["status"] == "added" else None
+        if t is None: remote.append(f)
+        else: f["content"] = t;  local.append(f)
+    def load(batch: List[Dict]) -> List[Dict]:
+        try: texts = fetch_blobs(owner, repo, head_sha, [f["path"] for f in batch])
+        except SystemExit as e:
+            print(f"[bot] GraphQL blob fetch failed, falling back to REST: {e}");  texts = {}
+        for f in batch:
+            t = texts.get(f["path"])
+            f["content"] = t if t is not None else fetch_content(owner, repo, f["path"], head_sha, f["raw_url"])
+        return batch
+    futs = [ex.submit(load, remote[i:i+BLOB_BATCH]) for i in range(0, len(remote), BLOB_BATCH)]
+    if local:
+        done = Future();  done.set_result(local);  futs.insert(0, done)
+    return futs
+
+HUNK = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))?", re.M)
+def diff_ranges(patch: str) -> List[Tuple[int,int]]:
+    """Sorted target-side line ranges [lo, hi] the patch covers (added + context lines).
+    Read straight off the hunk headers, so only '@@' lines are parsed, never the hunk bodies.
+    [] when nothing is anchorable (no patch, e.g. binary or too large, or deletions only): GitHub rejects a whole
+    batched review if any comment points outside the diff."""
+    out = []
+    for m in HUNK.finditer(patch):
+        lo, n = int(m.group(1)), int(m.group(2) or 1)
+        if n: out.append((lo, lo + n - 1))      # n == 0: pure deletion, nothing to anchor on
+    return sorted(out)
+
+def touched_spans(ranges: List[Tuple[int,int]], start: int, end: int) -> List[Tuple[int,int]]:
+    """One (first, last) span per hunk overlapping [start, end], clamped to it; [] if the section doesn't touch the diff.
+    Kept per hunk: GitHub requires start_line and line of a comment to sit in the same hunk."""
+    j = bisect.bisect_right(ranges, end, key=lambda r: r[0])            # ranges[:j] start <= end
+    i = bisect.bisect_left(ranges, start, key=lambda r: r[1])           # ranges[i:] end >= start
+    return [(max(lo, start), min(hi, end)) for lo, hi in ranges[i:j]]
+
+SECTION_SRC_CHARS = 8000   # cap on the source shown (and replaced) in one section prompt
+
+def split_span(lines: List[str], lo: int, hi: int, limit: int = SECTION_SRC_CHARS) -> List[Tuple[int,int]]:
+    """[lo, hi] cut into consecutive runs of whole lines whose text fits `limit` chars, so a suggestion never
+    replaces lines the model didn't see. A single line longer than `limit` is left out."""
+    out, a, size = [], lo, -1
+    for i in range(lo, hi + 1):
+        n = len(lines[i-1]) + 1
+        if size + n > limit:
+            if a < i: out.append((a, i - 1))
+            a, size = i, -1
+            if n - 1 > limit: a = i + 1;  continue
+        size += n
+    if a <= hi: out.append((a, hi))
     return out
 
-def anchor_lines(patch: str) -> List[int]:
-    if not patch: return [1]
-    head=1; add, ctx = [], []
-    for ln in patch.splitlines():
-        m=re.match(r"@@ -\d+(?:,\d+)? \+(\d+)", ln)
-        if m: head=int(m.group(1)); continue
-        if ln.startswith('+') and not ln.startswith('+++'): add.append(head); head+=1; continue
-        if ln.startswith(' ') or (ln and ln[0] not in '+-@'): ctx.append(head); head+=1; continue
-        if ln.startswith('-') and not ln.startswith('---'): continue
-    return (add+ctx) or [1]
+def hunks_between(patch: str, lo: int, hi: int) -> str:
+    """Only the hunks of `patch` whose target range overlaps [lo, hi] (whole patch if none do)."""
+    ms, keep = list(HUNK.finditer(patch)), []
+    for k, m in enumerate(ms):
+        a = int(m.group(1));  b = a + int(m.group(2) or 1) - 1
+        if a <= hi and b >= lo: keep.append(patch[m.start():ms[k+1].start() if k+1 < len(ms) else len(patch)])
+    return "".join(keep) or patch
 
 # ---------- sections ----------
 SEC = re.compile(r"^\s*#\s*---\s*section:\s*(.+?)\s*---\s*$", re.I)
-def find_sections(text: str) -> List[Tuple[str,int,int]]:
-    lines = text.splitlines(); marks=[]
-    for i,l in enumerate(lines,1):
-        m=SEC.match(l);  
-        if m: marks.append((m.group(1).strip(), i))
+SEC_HINT = re.compile(r"section:", re.I)   # every marker contains this; one C-level scan of the whole file
+# SEC over the whole text: [^\S\n] is \s that can't run past the end of a line
+SEC_ALL = re.compile(r"^[^\S\n]*#[^\S\n]*---[^\S\n]*section:[^\S\n]*(.+?)[^\S\n]*---[^\S\n]*$", re.I | re.M)
+def find_sections(text: str, lines: List[str]) -> List[Tuple[str,int,int]]:
+    # most files have no markers: skip the per-line regex entirely
+    if "---" not in text or not SEC_HINT.search(text): return [("entire-file",1,len(lines))]
+    marks=[]
+    if len(lines) == text.count("\n") + (not text.endswith("\n")):
+        # splitlines() agrees with '\n' (no \r / \f / \u2028 breaks): find markers in one scan, count lines between hits
+        pos, ln = 0, 1
+        for m in SEC_ALL.finditer(text):
+            ln += text.count("\n", pos, m.start());  pos = m.start()
+            marks.append((m.group(1).strip(), ln))
+    else:
+        match = SEC.match
+        for i,l in enumerate(lines,1):
+            m=match(l)
+            if m: marks.append((m.group(1).strip(), i))
     if not marks: return [("entire-file",1,len(lines))]
     spans=[]; 
     for i,(title,start) in enumerate(marks):
@@ -84,87 +322,282 @@ def find_sections(text: str) -> List[Tuple[str,int,int]]:
 
 # ---------- posting ----------
 def post_summary(owner:str, repo:str, pr:int, sha:str, body:str):
-    gh(f"/repos/{owner}/{repo}/pulls/{pr}/reviews", method="POST",
+    gh(f"/repos/{owner}/{repo}/pulls/{pr}/reviews", method="POST", write=True,
        json={"commit_id": sha, "event": "COMMENT", "body": body[:65000]})
 
+def suggestion_comment(path:str, start_line:int, end_line:int, body:str) -> Dict:
+    c = {"path": path, "side": "RIGHT", "line": int(end_line), "body": body[:65000]}
+    if start_line < end_line: c.update(start_line=int(start_line), start_side="RIGHT")  # GitHub rejects start_line == line
+    return c
+
 def post_suggestion(owner:str, repo:str, pr:int, sha:str, path:str, start_line:int, end_line:int, body:str) -> bool:
     try:
-        gh(f"/repos/{owner}/{repo}/pulls/{pr}/comments", method="POST",
-           json={"commit_id": sha, "path": path, "side": "RIGHT",
-                 "start_line": int(start_line), "start_side":"RIGHT",
-                 "line": int(end_line), "body": body[:65000]})
+        gh(f"/repos/{owner}/{repo}/pulls/{pr}/comments", method="POST", write=True,
+           json={"commit_id": sha, **suggestion_comment(path, start_line, end_line, body)})
         return True
     except SystemExit as e:
         print(f"[bot] failed to post suggestion for {path} {start_line}-{end_line}: {e}")
         return False
 
+def post_review(owner:str, repo:str, pr:int, sha:str, body:str, comments:List[Dict]) -> int:
+    """Summary + every inline suggestion in ONE review (one round trip, one rate-limit unit); returns suggestions posted.
+    GitHub rejects the whole review (422) if any comment can't be anchored: then post the summary alone and the suggestions
+    one by one. Any other failure (5xx, timeout) may have created the review anyway, so nothing is re-posted."""
+    if comments:
+        try:
+            gh(f"/repos/{owner}/{repo}/pulls/{pr}/reviews", method="POST", write=True,
+               json={"commit_id": sha, "event": "COMMENT", "body": body[:65000], "comments": comments})
+            return len(comments)
+        except GitHubError as e:
+            if e.status_code != 422:
+                print(f"[bot] batched review failed, not re-posting: {e}");  return 0
+            print(f"[bot] batched review rejected, posting suggestions one by one: {e}")
+    post_summary(owner, repo, pr, sha, body)
+    if not comments: return 0
+    # each POST is an independent network wait: overlap them (bounded) instead of paying N round trips in series
+    with ThreadPoolExecutor(max_workers=POST_WORKERS) as ex:
+        return sum(ex.map(lambda c: post_suggestion(owner, repo, pr, sha, c["path"], c.get("start_line", c["line"]),
+                                                    c["line"], c["body"]), comments))
+
 # ---------- LLM helpers ----------
 HAS_SUG = re.compile(r"```suggestion\b", re.I)
 
-def force_section_fix(llm, spec: str, file_path: str, title: str, section_src: str, diff: str) -> str:
-    """Ask the model for one actionable fix for this section; must output a GitHub suggestion block."""
-    prompt = (
-        "You are reviewing ONE code *section* in a pull request.\n"
-        "SPEC (must follow):\n"
-        f"{spec[:10000]}\n\n"
-        f"FILE: {file_path}\nSECTION: {title}\n\n"
-        "Unified diff for context (may be partial):\n"
-        f"```diff\n{diff[:8000]}\n```\n\n"
-        "Section source to review:\n"
-        f"```python\n{section_src[:8000]}\n```\n\n"
-        "TASK: If changes are needed, output exactly ONE GitHub suggestion block that replaces this **section**.\n"
-        "If no change is needed, reply with '# ok' only.\n"
-        "Format ONLY as:\n"
-        "```suggestion\n<full improved section code>\n```\n"
-    )
+class SectionCache:
+    """Answers keyed by model + spec + section body only: a hot in-process LRU over a warm on-disk LFU.
+    An untouched section skips the model even when its title, path or surrounding diff moved.
+    Warm entries hold only the cached_invoke key of the answer; the text itself lives once, in CACHE_DIR/llm."""
+    def __init__(self, path: str, hot_size: int = 256, warm_size: int = 2048, promote_after: int = 3):
+        self.path, self.hot_size, self.warm_size, self.promote_after = path, hot_size, warm_size, promote_after
+        self.hot: "OrderedDict[str, str]" = OrderedDict()
+        self.warm: Optional[Dict[str, Dict]] = None        # loaded on first use
+        self.lock = threading.Lock()                        # sections are reviewed from a thread pool
+
+    @staticmethod
+    def key(spec: str, section_src: str) -> str:
+        model = os.getenv("AZURE_OPENAI_DEPLOYMENT") or ""
+        return hashlib.sha256(f"{model}\0{spec[:10000]}\0{section_src}".encode()).hexdigest()
+
+    def _warm(self) -> Dict[str, Dict]:
+        if self.warm is None:
+            try:
+                with open(self.path, "rb") as f: warm = _loads(f.read())
+                self.warm = {k: e for k, e in warm.items() if {"ref", "hits", "ts"} <= e.keys()}   # skip older layouts
+            except (OSError, ValueError, AttributeError): self.warm = {}
+        return self.warm
+
+    def _put_hot(self, key: str, content: str):
+        self.hot[key] = content;  self.hot.move_to_end(key)
+        if len(self.hot) > self.hot_size: self.hot.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            e = self._warm().get(key)
+            if e is not None: e["hits"] += 1                  # LFU counts every use, hot or warm
+            if key in self.hot:
+                self.hot.move_to_end(key);  return self.hot[key]
+            if e is None: return None
+            # past LLM_CACHE_TTL, or the answer was pruned from CACHE_DIR/llm: a miss, asked again
+            content = cached_answer(e["ref"]) if time.time() - e["ts"] < LLM_CACHE_TTL else None
+            if content is None: del self.warm[key];  return None
+            if e["hits"] >= self.promote_after: self._put_hot(key, content)   # frequently reused -> hot
+            return content
+
+    def put(self, key: str, ref: str, content: str):
+        """`ref` is the cached_invoke key under which `content` is stored."""
+        with self.lock:
+            self._put_hot(key, content)
+            self._warm()[key] = {"ref": ref, "hits": 1, "ts": time.time()}
+
+    def save(self):
+        """Persist the warm tier: drop entries past LLM_CACHE_TTL, halve every count so frequency earned
+        in old runs fades, and evict the least-frequently used beyond warm_size (ties: newer entries win)."""
+        with self.lock:
+            if self.warm is None: return
+            cutoff = time.time() - LLM_CACHE_TTL
+            live = [(k, {**e, "hits": e["hits"] // 2}) for k, e in self.warm.items() if e["ts"] >= cutoff]
+            keep = dict(sorted(live, key=lambda kv: (kv[1]["hits"], kv[1]["ts"]), reverse=True)[:self.warm_size])
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "wb") as f: f.write(_dumps(keep))
+            except OSError as e:
+                print(f"[bot] could not save section cache: {e}")
+
+SECTIONS = SectionCache(os.path.join(CACHE_DIR, "sections.json"))
+
+SECTION_SYSTEM = "Be precise. Respect the SPEC. Output a single suggestion block or '# ok'."
+# Static scaffold, built once. The per-run-constant SPEC comes first so every section request shares
+# the same system + SPEC prefix, which provider-side prompt caching can reuse across sections.
+SECTION_PROMPT = (
+    "SPEC (must follow):\n"
+    "{spec}\n\n"
+    "You are reviewing ONE code *section* in a pull request.\n"
+    "FILE: {file}\nSECTION: {title}\n\n"
+    "Unified diff hunks touching these lines:\n"
+    "```diff\n{diff}\n```\n\n"
+    "{before}"
+    "Changed lines to review:\n"
+    "```python\n{src}\n```\n\n"
+    "{after}"
+    "TASK: If changes are needed, output exactly ONE GitHub suggestion block that replaces the **changed lines**.\n"
+    "If no change is needed, reply with '# ok' only.\n"
+    "Format ONLY as:\n"
+    "```suggestion\n<full improved replacement for the changed lines>\n```\n"
+)
+CONTEXT_BLOCK = "{where} lines (context only, do not repeat):\n```python\n{code}\n```\n\n"
+
+def force_section_fix(llm, spec: str, file_path: str, title: str, section_src: str, diff: str,
+                      before: str = "", after: str = "") -> str:
+    """Ask the model for one actionable fix for the changed lines of this section; must output a GitHub suggestion block.
+    `before` / `after` are read-only context around `section_src`, which is exactly what the suggestion replaces."""
+    key = SectionCache.key(spec, f"{before}\0{section_src}\0{after}")
+    hit = SECTIONS.get(key)
+    if hit is not None: return hit
+    prompt = SECTION_PROMPT.format(
+        spec=spec[:10000], file=file_path, title=title, diff=diff[:8000], src=section_src[:SECTION_SRC_CHARS],
+        before=CONTEXT_BLOCK.format(where="Preceding", code=before) if before else "",
+        after=CONTEXT_BLOCK.format(where="Following", code=after) if after else "")
+    md = cached_invoke(llm, SECTION_SYSTEM, prompt)
+    SECTIONS.put(key, llm_cache_key(SECTION_SYSTEM, prompt), md)
+    return md
+
+LLM_CACHE_TTL = 7 * 24 * 3600   # seconds a cached section answer stays valid
+_llm_memo: Dict[str, str] = {}
+
+def llm_cache_key(system: str, prompt: str) -> str:
+    model = os.getenv("AZURE_OPENAI_DEPLOYMENT") or ""
+    return hashlib.blake2b("\0".join((model, system, prompt)).encode(), digest_size=16).hexdigest()
+
+def _llm_cache_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, "llm", f"{key}.json")
+
+def cached_answer(key: str) -> Optional[str]:
+    """The answer stored under `key` if it is younger than LLM_CACHE_TTL, else None."""
+    if key in _llm_memo: return _llm_memo[key]
+    try:
+        with open(_llm_cache_path(key), "rb") as f: hit = _loads(f.read())
+        if time.time() - hit["ts"] < LLM_CACHE_TTL:
+            _llm_memo[key] = hit["content"];  return hit["content"]
+    except (OSError, ValueError, KeyError): pass
+    return None
+
+def cached_invoke(llm, system: str, prompt: str) -> str:
+    """llm.invoke() behind an exact-match cache (in-process + CACHE_DIR/llm), keyed by model + full prompt.
+    Re-runs on force-pushes / CI retries get identical prompts for unchanged sections and skip the model."""
+    key = llm_cache_key(system, prompt)
+    content = cached_answer(key)
+    if content is not None: return content
     resp = llm.invoke([
-        {"role":"system","content":"Be precise. Respect the SPEC. Output a single suggestion block or '# ok'."},
+        {"role":"system","content":system},
         {"role":"user","content":prompt}
     ])
-    return getattr(resp, "content", str(resp))
+    content = _llm_memo[key] = getattr(resp, "content", str(resp))
+    path, entry = _llm_cache_path(key), {"content": content, "model": os.getenv("AZURE_OPENAI_DEPLOYMENT") or "", "ts": time.time()}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f: f.write(_dumps(entry))
+    except OSError as e:
+        print(f"[bot] could not cache LLM answer: {e}")
+    return content
+
+def prune_llm_cache():
+    """Delete cached answers older than LLM_CACHE_TTL. The TTL is only checked on read and actions/cache
+    saves the whole directory after every run, so without this the cache would only ever grow."""
+    root, cutoff = os.path.join(CACHE_DIR, "llm"), time.time() - LLM_CACHE_TTL
+    try: entries = list(os.scandir(root))
+    except OSError: return
+    for e in entries:   # mtime == the entry's "ts": files are written once and never rewritten
+        try:
+            if e.stat().st_mtime < cutoff: os.remove(e.path)
+        except OSError: pass
 
 # ---------- main ----------
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "6"))   # parallel per-section LLM calls (provider rate limits)
+CONTEXT_LINES = 20                                          # read-only lines shown around the touched span
+# Opt-in: a one-line auth, validation or SQL change is small but still deserves review, so by default every PR is reviewed
+SKIP_TRIVIAL = os.getenv("REVIEW_BOT_SKIP_TRIVIAL", "").lower() in ("1", "true", "yes")
+TRIVIAL_TOTAL_ADDED = 5   # with SKIP_TRIVIAL, skip the LLM when the PR adds fewer lines than this in total ...
+TRIVIAL_FILE_ADDED = 2    # ... and no single file adds more than this
+
+def is_trivial(files: List[Dict]) -> bool:
+    return (SKIP_TRIVIAL and sum(f["additions"] for f in files) < TRIVIAL_TOTAL_ADDED
+            and all(f["additions"] <= TRIVIAL_FILE_ADDED for f in files))
+
 def main():
     owner, repo, pr, sha = pr_ctx()
-    spec = fetch_spec()
-    files = changed_py_files(owner, repo, pr, sha)
+    files = changed_py_files(owner, repo, pr)
     if not files:
-        gh(f"/repos/{owner}/{repo}/issues/{pr}/comments", method="POST",
+        gh(f"/repos/{owner}/{repo}/issues/{pr}/comments", method="POST", write=True,
            json={"body":"🤖 Review Bot: No Python file changes detected."})
         return
+    if is_trivial(files):
+        gh(f"/repos/{owner}/{repo}/issues/{pr}/comments", method="POST", write=True,
+           json={"body":"🤖 Review Bot: Trivial change (only a few added lines); skipping the LLM review."})
+        return
+    with contextlib.ExitStack() as stack:
+        def executor(workers: int) -> ThreadPoolExecutor:
+            # shut down when the block below exits; on an error, queued downloads / LLM calls are cancelled, not run
+            ex = ThreadPoolExecutor(max_workers=workers)
+            stack.callback(ex.shutdown, wait=False, cancel_futures=True);  return ex
+        # Pipeline: downloads start now (overlapping the spec fetch) and Pass 2 consumes
+        # files as they land, so per-section LLM calls begin before the slowest download.
+        pool = executor(FETCH_WORKERS)
+        loads = start_content_fetch(pool, owner, repo, sha, files)
+        spec = fetch_spec()
 
-    # Pass 1: whole-PR review (kept for richer guidance in the Checks tab)
-    whole_md = review(spec, files) or ""
-    post_summary(owner, repo, pr, sha,
-                 f"### 🤖 Review Bot\n**Spec:** {os.getenv('CONF_URL')}\n\n"
-                 "Inline suggestions are posted per section. Full review is available in this check.\n\n"
-                 f"{whole_md[:45000]}")
+        # Pass 1: whole-PR review (kept for richer guidance in the Checks tab).
+        # It is independent of Pass 2, so run it in the background once every file is downloaded.
+        def whole_review() -> str:
+            wait(loads);  return review(spec, files)
+        bg = executor(1)
+        whole = bg.submit(whole_review)
 
-    # Pass 2 (guaranteed actionable): per-section fix requests
-    llm = make_llm()
-    posted = 0
-    for f in files:
-        path, text, patch = f["path"], (f.get("content") or ""), f.get("patch","")
-        if not text: continue
-        anchors = anchor_lines(patch)
-        for title, start, end in find_sections(text):
-            # Only post inline if the section touches the diff (GitHub requires diff lines)
-            diff_lines_in_section = [a for a in anchors if start <= a <= end]
-            if not diff_lines_in_section:
-                continue
-            section_src = "\n".join(text.splitlines()[start-1:end])
-            md = force_section_fix(llm, spec, path, title, section_src, patch)
+        # Pass 2 (guaranteed actionable): per-section fix requests.
+        # Section calls are independent network waits: fan them out (bounded), then post in file / line order.
+        llm = make_llm()
+        llm_pool = executor(LLM_CONCURRENCY)
+        jobs = []
+        for f in (f for done in as_completed(loads) for f in done.result()):
+            path, text, patch, ranges = f["path"], (f.get("content") or ""), f.get("patch",""), f["ranges"]
+            if not text: continue
+            lines = text.splitlines()  # once per file; sections slice this list
+            for title, start, end in find_sections(text, lines):
+                # Only post inline where the section touches the diff (GitHub requires diff lines);
+                # one job per touched hunk, so no suggestion spans the unchanged code between hunks,
+                # and big hunks split where the prompt would otherwise cut the source off
+                for lo, hi in (p for span in touched_spans(ranges, start, end) for p in split_span(lines, *span)):
+                    # review (and replace) just the touched lines, with a little read-only context,
+                    # instead of the whole section: far fewer prompt tokens on large sections
+                    src = "\n".join(lines[lo-1:hi])
+                    before = "\n".join(lines[max(start, lo - CONTEXT_LINES) - 1:lo-1])
+                    after = "\n".join(lines[hi:min(end, hi + CONTEXT_LINES)])
+                    # multi-line suggestion anchored on the touched span (start_line + line)
+                    jobs.append((path, lo, hi, llm_pool.submit(force_section_fix, llm, spec, path, title, src,
+                                                               hunks_between(patch, lo, hi), before, after)))
+
+        # files land in download order: sort so comment order and the dedupe winner are the same every run
+        jobs.sort(key=lambda j: j[:2])
+        comments, dupes, seen = [], 0, set()
+        for path, start, end_line, fut in jobs:
+            md = fut.result()
             if md.strip() == "# ok":  # model thinks it's fine
                 continue
             if not HAS_SUG.search(md or ""):
                 continue  # do not fabricate fixes; rely on LLM
-            # anchor to the last touched line in this section (multi-line suggestion uses start_line + line)
-            end_line = diff_lines_in_section[-1]
-            if post_suggestion(owner, repo, pr, sha, path, start_line=start, end_line=end_line, body=md):
-                posted += 1
+            if (path, md) in seen:  # identical suggestion already posted on this file
+                dupes += 1;  continue
+            seen.add((path, md))
+            comments.append(suggestion_comment(path, start, end_line, md))
+        whole_md = whole.result() or ""
+    SECTIONS.save();  prune_llm_cache()
+    posted = post_review(owner, repo, pr, sha,
+                         f"### 🤖 Review Bot\n**Spec:** {os.getenv('CONF_URL')}\n\n"
+                         "Inline suggestions are posted per section. Full review is available in this check.\n\n"
+                         + (f"_{dupes} duplicate inline suggestion(s) were not re-posted._\n\n" if dupes else "")
+                         + f"{whole_md[:45000]}",
+                         comments)
 
     if posted == 0:
-        gh(f"/repos/{owner}/{repo}/issues/{pr}/comments", method="POST",
+        gh(f"/repos/{owner}/{repo}/issues/{pr}/comments", method="POST", write=True,
            json={"body":"🤖 Review Bot: No inline suggestions could be anchored to the diff (sections unchanged). "
                         "See the review summary above for guidance."})
 
@@ -0,0 +1,21 @@
+# content_from_patch(): an added file's text is its single all-'+' hunk
+from review_bot.main import content_from_patch
+
+def test_added_file_is_rebuilt():
+    assert content_from_patch("@@ -0,0 +1,2 @@\n+a\n+b") == "a\nb\n"
+    assert content_from_patch("@@ -0,0 +1,2 @@\n+a\n+b\n") == "a\nb\n"
+    assert content_from_patch("@@ -0,0 +1 @@\n+x") == "x\n"
+
+def test_blank_and_crlf_lines_survive():
+    assert content_from_patch("@@ -0,0 +1,3 @@\n+a\n+\n+b\r") == "a\n\nb\r\n"
+
+def test_no_newline_at_end_of_file():
+    assert content_from_patch("@@ -0,0 +1,2 @@\n+a\n+b\n\\ No newline at end of file") == "a\nb"
+    assert content_from_patch("@@ -0,0 +1,2 @@\n+a\n+b\n\\ No newline at end of file\n") == "a\nb"
+
+def test_anything_else_is_not_trusted():
+    assert content_from_patch("") is None
+    assert content_from_patch("@@ -1,1 +1,2 @@\n a\n+b") is None           # not an added file
+    assert content_from_patch("@@ -0,0 +1,3 @@\n+a\n+b") is None           # truncated patch
+    assert content_from_patch("@@ -0,0 +1,2 @@\n+a\n b") is None           # non-'+' line
+    assert content_from_patch("@@ -0,0 +1,1 @@\n+a\n@@ -0,0 +2,1 @@\n+b") is None
@@ -0,0 +1,48 @@
+# diff_ranges() / touched_spans() / hunks_between() / split_span(): which target lines a section suggestion may cover
+from review_bot.main import diff_ranges, touched_spans, hunks_between, split_span
+
+TWO_HUNKS = "@@ -1,4 +1,4 @@\n a\n-b\n+B\n c\n d\n@@ -21,4 +21,5 @@\n w\n-x\n+X\n+X2\n y\n z"
+
+def test_ranges_come_from_hunk_headers():
+    assert diff_ranges(TWO_HUNKS) == [(1, 4), (21, 25)]
+
+def test_count_defaults_to_one_and_pure_deletions_are_skipped():
+    assert diff_ranges("@@ -3 +3 @@\n-a\n+b") == [(3, 3)]
+    assert diff_ranges("@@ -5,2 +4,0 @@\n-a\n-b\n@@ -9,1 +8,2 @@\n a\n+b") == [(8, 9)]
+
+def test_hunk_bodies_are_not_parsed():
+    # "+@@ ..." is an added line, not a header; "\ No newline" is not a target line
+    assert diff_ranges("@@ -1,1 +1,2 @@\n a\n+@@ -50,1 +50,1 @@\n\\ No newline at end of file") == [(1, 2)]
+
+def test_nothing_to_anchor_without_target_lines():
+    assert diff_ranges("") == []
+    assert diff_ranges("@@ -2,3 +1,0 @@\n-a\n-b\n-c") == []
+    assert touched_spans([], 1, 10) == []
+
+def test_touched_spans_one_per_hunk():
+    # GitHub wants start_line and line in the same hunk, so a section over two hunks gives two spans
+    ranges = diff_ranges(TWO_HUNKS)
+    assert touched_spans(ranges, 1, 30) == [(1, 4), (21, 25)]
+    assert touched_spans(ranges, 3, 22) == [(3, 4), (21, 22)]
+    assert touched_spans(ranges, 3, 10) == [(3, 4)]
+    assert touched_spans(ranges, 5, 20) == []
+    assert touched_spans(ranges, 26, 40) == []
+
+def test_hunks_between_keeps_only_overlapping_hunks():
+    first, second = TWO_HUNKS[:TWO_HUNKS.index("@@ -21")], TWO_HUNKS[TWO_HUNKS.index("@@ -21"):]
+    assert hunks_between(TWO_HUNKS, 2, 3) == first
+    assert hunks_between(TWO_HUNKS, 25, 30) == second
+    assert hunks_between(TWO_HUNKS, 4, 21) == TWO_HUNKS
+    assert hunks_between(TWO_HUNKS, 10, 12) == TWO_HUNKS     # nothing overlaps: whole patch
+
+def test_split_span_keeps_each_piece_within_the_prompt_cap():
+    lines = ["aaaa", "bbbb", "cccc", "dddd", "eeee"]          # 4 chars each, 9 for two joined
+    assert split_span(lines, 1, 5, limit=100) == [(1, 5)]
+    assert split_span(lines, 1, 5, limit=9) == [(1, 2), (3, 4), (5, 5)]
+    assert split_span(lines, 2, 4, limit=8) == [(2, 2), (3, 3), (4, 4)]
+    assert all(len("\n".join(lines[a-1:b])) <= 14 for a, b in split_span(lines, 1, 5, limit=14))
+
+def test_split_span_drops_a_line_longer_than_the_cap():
+    lines = ["a", "x" * 50, "b", "c"]
+    assert split_span(lines, 1, 4, limit=10) == [(1, 1), (3, 4)]
+    assert split_span(lines, 2, 2, limit=10) == []
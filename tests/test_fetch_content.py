@@ -0,0 +1,12 @@
+# fetch_content(): one download per file and ref, but a failed ("") download is tried again
+from review_bot import main as m
+
+def test_only_successful_downloads_are_memoized(monkeypatch):
+    got = ["", "text"];  calls = []
+    def download(*a): calls.append(a);  return got.pop(0)
+    monkeypatch.setattr(m, "_download_content", download);  monkeypatch.setattr(m, "_content_memo", {})
+    args = ("o", "r", "a.py", "sha", None)
+    assert m.fetch_content(*args) == ""
+    assert m.fetch_content(*args) == "text"
+    assert m.fetch_content(*args) == "text"
+    assert calls == [args, args]
@@ -0,0 +1,52 @@
+# fetch_spec(): conditional GETs against the on-disk spec cache
+import json, requests, pytest
+from review_bot import main as m
+
+PAGE = {"version": {"number": 3}, "body": {"storage": {"value": "<p>spec</p>"}}}
+
+def resp(status, body=None, headers=None):
+    r = requests.Response();  r.status_code = status
+    r._content = json.dumps(body).encode() if body is not None else b""
+    r.headers.update(headers or {});  return r
+
+class FakeConf:
+    def __init__(self, *responses): self.responses, self.sent = list(responses), []
+    def get(self, url, **kw):
+        self.sent.append(kw.get("headers") or {});  return self.responses.pop(0)
+
+@pytest.fixture
+def conf(monkeypatch, tmp_path):
+    monkeypatch.setattr(m, "CACHE_DIR", str(tmp_path))
+    for k, v in {"CONF_URL": "https://wiki/page", "CONF_USERNAME": "u", "CONF_API": "t"}.items(): monkeypatch.setenv(k, v)
+    def use(*responses):
+        fake = FakeConf(*responses);  monkeypatch.setattr(m, "_S", fake);  return fake
+    return use
+
+def test_etag_is_sent_back_and_304_uses_the_cache(conf):
+    conf(resp(200, PAGE, {"ETag": '"e1"'}))
+    assert m.fetch_spec() == "spec"
+    fake = conf(resp(304))
+    assert m.fetch_spec() == "spec"
+    assert fake.sent == [{"If-None-Match": '"e1"'}]
+
+def test_last_modified_is_sent_back(conf):
+    conf(resp(200, PAGE, {"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}))
+    m.fetch_spec()
+    fake = conf(resp(304))
+    assert m.fetch_spec() == "spec"
+    assert fake.sent == [{"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}]
+
+def test_same_version_without_validators_reuses_the_cached_text(conf):
+    conf(resp(200, PAGE))
+    assert m.fetch_spec() == "spec"
+    conf(resp(200, {**PAGE, "body": {"storage": {"value": "<p>not stripped again</p>"}}}))
+    assert m.fetch_spec() == "spec"
+    conf(resp(200, {**PAGE, "version": {"number": 4}, "body": {"storage": {"value": "<p>v4</p>"}}}))
+    assert m.fetch_spec() == "v4"
+
+def test_nothing_is_cached_without_validators_or_version(conf, tmp_path):
+    conf(resp(200, {"body": {"storage": {"value": "<p>a</p>"}}}))
+    assert m.fetch_spec() == "a"
+    assert list(tmp_path.iterdir()) == []
+    fake = conf(resp(200, {"body": {"storage": {"value": "<p>b</p>"}}}))
+    assert m.fetch_spec() == "b" and fake.sent == [{}]
@@ -0,0 +1,28 @@
+# find_sections(): "# --- section: <title> ---" markers split a file into (title, start, end) spans
+from review_bot.main import find_sections
+
+def sections(text): return find_sections(text, text.splitlines())
+
+def test_markers_on_plain_newlines():
+    text = "import os\n# --- section: Setup ---\nx = 1\n\n# --- Section: Run ---\nrun()\n"
+    assert sections(text) == [("Setup", 2, 4), ("Run", 5, 6)]
+
+def test_last_marker_without_trailing_newline():
+    assert sections("a\n# --- section: A ---") == [("A", 2, 2)]
+
+def test_marker_spacing_and_case_are_loose():
+    assert sections("a\r\n  #---Section:  b c ---  \r\nx\r\n") == [("b c", 2, 3)]
+    assert sections("# --- section: ---\nx\n") == [("", 1, 2)]
+
+def test_markers_must_own_the_whole_line():
+    assert sections('x = "# --- section: no ---"\n# --- section: yes ---\n') == [("yes", 2, 2)]
+
+def test_line_numbers_follow_splitlines_breaks():
+    # '\r' and '\f' break lines for splitlines() too, so they count towards line numbers
+    assert sections("a\r# --- section: A ---\rb\r# --- section: B ---\r") == [("A", 2, 3), ("B", 4, 4)]
+    assert sections("# --- section: A ---\n\x0c# --- section: B ---\nc\n") == [("A", 1, 2), ("B", 3, 4)]
+
+def test_no_markers_is_whole_file():
+    assert sections("a = 1\nb = '---'\n") == [("entire-file", 1, 2)]
+    assert sections("# section: not a marker\n") == [("entire-file", 1, 1)]
+    assert sections("") == [("entire-file", 1, 0)]
@@ -0,0 +1,77 @@
+# _gh_response(): which failures are retried, and never a write that may have reached GitHub
+import requests, pytest
+from review_bot import main as m
+
+def resp(status, headers=None):
+    r = requests.Response();  r.status_code = status;  r._content = b"{}"
+    r.headers.update(headers or {});  return r
+
+class FakeGitHub:
+    def __init__(self, *script): self.script, self.calls = list(script), 0
+    def request(self, method, url, **kw):
+        self.calls += 1;  x = self.script.pop(0)
+        if isinstance(x, Exception): raise x
+        return x
+
+@pytest.fixture
+def github(monkeypatch):
+    monkeypatch.setattr(m, "_backoff", lambda *a: 0)
+    def use(*script):
+        fake = FakeGitHub(*script);  monkeypatch.setattr(m, "_gh_session", lambda: fake);  return fake
+    return use
+
+def test_get_errors_are_left_to_the_adapter(github):
+    fake = github(resp(502))
+    with pytest.raises(SystemExit): m._gh_response("/x")
+    assert fake.calls == 1
+    fake = github(requests.ConnectionError("reset"))
+    with pytest.raises(SystemExit): m._gh_response("/x")
+    assert fake.calls == 1
+
+def test_secondary_rate_limit_is_retried_even_for_get(github):
+    fake = github(resp(403, {"Retry-After": "1"}), resp(200))
+    assert m._gh_response("/x").status_code == 200 and fake.calls == 2
+
+def test_plain_403_is_not_retried(github):
+    fake = github(resp(403), resp(200))
+    with pytest.raises(SystemExit): m._gh_response("/x")
+    assert fake.calls == 1
+
+def test_read_posts_retry_5xx_and_timeouts_up_to_the_limit(github):
+    fake = github(resp(502), requests.ReadTimeout("slow"), resp(200))
+    assert m._gh_response("/graphql", method="POST", json={}).status_code == 200 and fake.calls == 3
+    fake = github(*[resp(503)] * (m.GH_RETRIES + 1))
+    with pytest.raises(SystemExit): m._gh_response("/graphql", method="POST", json={})
+    assert fake.calls == m.GH_RETRIES + 1
+
+def test_write_is_not_repeated_after_a_5xx_or_read_timeout(github):
+    for failure in (resp(502), requests.ReadTimeout("slow"), requests.ConnectionError("reset")):
+        fake = github(failure, resp(201))
+        with pytest.raises(SystemExit): m._gh_response("/c", method="POST", write=True, json={})
+        assert fake.calls == 1
+
+def test_write_is_retried_when_github_refused_it(github):
+    for refusal in (resp(429), resp(403, {"Retry-After": "2"}), requests.ConnectTimeout("no route")):
+        fake = github(refusal, resp(201))
+        assert m._gh_response("/c", method="POST", write=True, json={}).status_code == 201 and fake.calls == 2
+
+def test_backoff_honours_retry_after_up_to_a_minute():
+    assert m._backoff(0, resp(403, {"Retry-After": "7"})) == 7.0
+    assert m._backoff(0, resp(403, {"Retry-After": "3600"})) == 60.0
+    assert 1.0 <= m._backoff(0) <= 1.5 and 4.0 <= m._backoff(2) <= 6.0
+
+def test_urllib3_retries_cap_retry_after_too():
+    retry = m._S.get_adapter("https://example.com").max_retries
+    assert isinstance(retry, m._CappedRetry) and isinstance(retry.increment("GET", "/x"), m._CappedRetry)
+    for value, slept in (("3600", m.RETRY_AFTER_CAP), ("5", 5.0)):
+        r = type("Resp", (), {"headers": {"Retry-After": value}})()
+        assert retry.get_retry_after(r) == slept
+    assert retry.get_retry_after(type("Resp", (), {"headers": {}})()) is None
+
+def test_errors_carry_the_status_code(github):
+    github(resp(422))
+    with pytest.raises(m.GitHubError) as e: m._gh_response("/c", method="POST", write=True, json={})
+    assert e.value.status_code == 422
+    github(requests.ReadTimeout("slow"))
+    with pytest.raises(m.GitHubError) as e: m._gh_response("/c", method="POST", write=True, json={})
+    assert e.value.status_code is None
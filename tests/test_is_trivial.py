@@ -0,0 +1,16 @@
+# is_trivial(): the small-PR shortcut is opt-in and bounded by added lines
+from review_bot import main as m
+
+def files(*added): return [{"path": f"f{i}.py", "additions": n} for i, n in enumerate(added)]
+
+def test_off_by_default(monkeypatch):
+    monkeypatch.setattr(m, "SKIP_TRIVIAL", False)
+    assert not m.is_trivial(files(1))
+    assert not m.is_trivial(files(0))
+
+def test_thresholds_when_enabled(monkeypatch):
+    monkeypatch.setattr(m, "SKIP_TRIVIAL", True)
+    assert m.is_trivial(files(1))
+    assert m.is_trivial(files(2, 2))
+    assert not m.is_trivial(files(2, 2, 1))     # 5 added lines in total
+    assert not m.is_trivial(files(3))           # one file adds more than 2
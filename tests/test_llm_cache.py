@@ -0,0 +1,56 @@
+# cached_invoke(): exact-match answer cache, in-process and on disk, with a TTL
+import os, json, time, pytest
+from review_bot import main as m
+
+class FakeLLM:
+    def __init__(self): self.calls = 0
+    def invoke(self, msgs):
+        self.calls += 1;  return type("Resp", (), {"content": f"answer{self.calls}"})()
+
+@pytest.fixture
+def llm(monkeypatch, tmp_path):
+    monkeypatch.setattr(m, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(m, "_llm_memo", {})
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT", "gpt-a")
+    return FakeLLM()
+
+def entries(tmp_path): return sorted((tmp_path / "llm").iterdir())
+
+def test_same_prompt_is_answered_once(llm, tmp_path):
+    assert m.cached_invoke(llm, "sys", "p") == "answer1"
+    assert m.cached_invoke(llm, "sys", "p") == "answer1"
+    m._llm_memo.clear()                                  # next run: only the disk copy is left
+    assert m.cached_invoke(llm, "sys", "p") == "answer1"
+    assert llm.calls == 1
+    (e,) = entries(tmp_path)
+    assert json.loads(e.read_text())["model"] == "gpt-a"
+
+def test_prompt_system_and_model_are_all_in_the_key(llm, monkeypatch):
+    m.cached_invoke(llm, "sys", "p");  m.cached_invoke(llm, "sys", "q");  m.cached_invoke(llm, "sys2", "p")
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT", "gpt-b")
+    m.cached_invoke(llm, "sys", "p")
+    assert llm.calls == 4
+
+def test_answers_older_than_the_ttl_are_asked_again(llm, tmp_path):
+    m.cached_invoke(llm, "sys", "p")
+    (e,) = entries(tmp_path)
+    hit = json.loads(e.read_text());  hit["ts"] = time.time() - m.LLM_CACHE_TTL - 1
+    e.write_text(json.dumps(hit));  m._llm_memo.clear()
+    assert m.cached_invoke(llm, "sys", "p") == "answer2"
+    assert json.loads(e.read_text())["ts"] > time.time() - 60
+
+def test_unreadable_entry_is_a_miss(llm, tmp_path):
+    m.cached_invoke(llm, "sys", "p")
+    (e,) = entries(tmp_path);  e.write_text("{not json");  m._llm_memo.clear()
+    assert m.cached_invoke(llm, "sys", "p") == "answer2"
+
+def test_prune_drops_only_expired_entries(llm, tmp_path):
+    m.cached_invoke(llm, "sys", "old")
+    (old,) = entries(tmp_path);  stale = time.time() - m.LLM_CACHE_TTL - 1;  os.utime(old, (stale, stale))
+    m.cached_invoke(llm, "sys", "new")
+    (new,) = set(entries(tmp_path)) - {old}
+    m.prune_llm_cache()
+    assert entries(tmp_path) == [new]
+
+def test_prune_without_a_cache_dir_is_a_no_op(llm):
+    m.prune_llm_cache()
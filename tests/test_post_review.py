@@ -0,0 +1,44 @@
+# post_review(): one batched review; per-comment fallback only when GitHub rejected the batch (422)
+import pytest
+from review_bot import main as m
+
+COMMENTS = [m.suggestion_comment("a.py", 1, 2, "s1"), m.suggestion_comment("b.py", 5, 5, "s2")]
+
+@pytest.fixture
+def github(monkeypatch):
+    calls = []
+    def use(batch_error=None, comment_error=None):
+        def gh(path, method="GET", **kw):
+            calls.append((path, sorted(kw["json"])))
+            if "comments" in kw["json"] and batch_error: raise batch_error
+            if path.endswith("/comments") and comment_error: raise comment_error
+            return {}
+        monkeypatch.setattr(m, "gh", gh);  return calls
+    return use
+
+def post(comments=COMMENTS): return m.post_review("o", "r", 7, "sha", "summary", comments)
+
+def test_batch_goes_out_as_one_review(github):
+    calls = github()
+    assert post() == 2
+    assert calls == [("/repos/o/r/pulls/7/reviews", ["body", "comments", "commit_id", "event"])]
+
+def test_422_falls_back_to_summary_and_single_comments(github):
+    calls = github(batch_error=m.GitHubError("unprocessable", 422))
+    assert post() == 2
+    assert [p for p, _ in calls] == ["/repos/o/r/pulls/7/reviews", "/repos/o/r/pulls/7/reviews",
+                                     "/repos/o/r/pulls/7/comments", "/repos/o/r/pulls/7/comments"]
+
+def test_failed_single_comments_are_not_counted(github):
+    github(batch_error=m.GitHubError("unprocessable", 422), comment_error=m.GitHubError("bad line", 422))
+    assert post() == 0
+
+@pytest.mark.parametrize("error", [m.GitHubError("server error", 502), m.GitHubError("read timeout")])
+def test_other_failures_are_not_re_posted(github, error):
+    calls = github(batch_error=error)
+    assert post() == 0 and len(calls) == 1
+
+def test_no_comments_posts_the_summary_only(github):
+    calls = github()
+    assert post([]) == 0
+    assert calls == [("/repos/o/r/pulls/7/reviews", ["body", "commit_id", "event"])]
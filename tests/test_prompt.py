@@ -0,0 +1,78 @@
+# build_prompt(): exact layout of the whole-PR review prompt
+import pytest
+from review_bot import llm
+from review_bot.llm import build_prompt, pack_files
+
+HEAD = "# SPEC (from Confluence)\n\n"
+FILES = "\n\n\n# CHANGED FILES (unified diffs + snapshots)\n"
+TASK = ("\n\n# Review Task\n"
+        "- For each file, list issues as bullets.\n"
+        "- Cite SPEC when applicable.\n"
+        "- Provide **GitHub suggestion blocks** for exact replacements.\n"
+        "- Keep suggestions minimal and safe.\n"
+        "- Output markdown.\n")
+
+def test_file_with_patch_and_snapshot():
+    f = {"path": "a.py", "status": "modified", "patch": "@@ -1 +1 @@\n-x\n+y", "content": "y\n"}
+    assert build_prompt("  S  ", [f]) == (
+        HEAD + "S" + FILES +
+        "\n## a.py (modified)\n"
+        "\n```diff\n@@ -1 +1 @@\n-x\n+y\n```"
+        "\n\n<current file snapshot: a.py>\n```python\ny\n\n```\n" + TASK)
+
+def test_missing_fields_leave_only_the_header():
+    assert build_prompt("S", [{"path": "b.py"}, {"path": "c.py", "status": "removed", "patch": "", "content": ""}]) == (
+        HEAD + "S" + FILES + "\n## b.py ()\n" + "\n## c.py (removed)\n" + TASK)
+
+def test_no_files():
+    assert build_prompt("", []) == HEAD + FILES + TASK
+
+def test_spec_patch_and_snapshot_are_capped_at_20000_chars():
+    f = {"path": "d.py", "status": "added", "patch": "p" * 20001, "content": "c" * 20001}
+    assert build_prompt("s" * 20001, [f]) == (
+        HEAD + "s" * 20000 + FILES + "\n## d.py (added)\n"
+        "\n```diff\n" + "p" * 20000 + "\n```"
+        "\n\n<current file snapshot: d.py>\n```python\n" + "c" * 20000 + "\n```\n" + TASK)
+
+# pack_files() / review(): greedy packing under MAX_PROMPT_CHARS, one model call per batch
+A, B, C = ({"path": f"{n}.py", "status": "modified", "patch": "x" * 100} for n in "abc")
+BLOCK = len(llm._file_block(A))
+
+@pytest.fixture
+def room(monkeypatch):
+    def set_room(n): monkeypatch.setattr(llm, "MAX_PROMPT_CHARS", len(build_prompt("S", [])) + n)
+    return set_room
+
+def test_files_fill_each_batch_in_order(room):
+    room(2 * BLOCK)
+    assert pack_files("S", [A, B, C]) == [[A, B], [C]]
+    room(2 * BLOCK - 1)
+    assert pack_files("S", [A, B, C]) == [[A], [B], [C]]
+    room(3 * BLOCK)
+    assert pack_files("S", [A, B, C]) == [[A, B, C]]
+
+def test_oversized_file_gets_a_batch_of_its_own(room):
+    big = {"path": "big.py", "status": "added", "patch": "y" * 5000}
+    room(2 * BLOCK)
+    assert pack_files("S", [A, big, B, C]) == [[A], [big], [B, C]]
+
+def test_no_files_is_one_empty_batch(room):
+    room(BLOCK)
+    assert pack_files("S", []) == [[]]
+
+class FakeLLM:
+    def __init__(self): self.prompts = []
+    def invoke(self, msgs):
+        self.prompts.append(msgs[1]["content"])
+        return type("Resp", (), {"content": f"out-{msgs[1]['content'].count('## ')}-{len(self.prompts)}"})()
+
+def test_one_batch_is_one_call_with_the_full_prompt(room, monkeypatch):
+    fake = FakeLLM();  monkeypatch.setattr(llm, "make_llm", lambda: fake);  room(3 * BLOCK)
+    assert llm.review("S", [A, B, C]) == "out-3-1"
+    assert fake.prompts == [build_prompt("S", [A, B, C])]
+
+def test_batches_are_reviewed_separately_and_joined_in_order(room, monkeypatch):
+    fake = FakeLLM();  monkeypatch.setattr(llm, "make_llm", lambda: fake);  room(2 * BLOCK)
+    out = llm.review("S", [A, B, C])
+    assert sorted(fake.prompts) == sorted([build_prompt("S", [A, B]), build_prompt("S", [C])])
+    assert out.split("\n\n")[0].startswith("out-2-") and out.split("\n\n")[1].startswith("out-1-")
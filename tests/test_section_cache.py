@@ -0,0 +1,64 @@
+# SectionCache: hot LRU over a warm on-disk LFU of section answers, aged per run and bounded by LLM_CACHE_TTL
+import json, time, pytest
+from review_bot import main as m
+
+class FakeLLM:
+    def __init__(self): self.calls = 0
+    def invoke(self, msgs):
+        self.calls += 1;  return type("Resp", (), {"content": f"```suggestion\nfix{self.calls}\n```"})()
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(m, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(m, "_llm_memo", {})
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT", "gpt-a")
+    def next_run():   # a fresh process: new SectionCache over the saved file, empty memo
+        m._llm_memo.clear()
+        c = m.SectionCache(str(tmp_path / "sections.json"));  monkeypatch.setattr(m, "SECTIONS", c);  return c
+    return next_run
+
+def fix(llm, src, title="t", path="a.py", diff="@@ -1 +1 @@"): return m.force_section_fix(llm, "SPEC", path, title, src, diff)
+
+def test_same_body_is_answered_once_across_runs(cache, tmp_path):
+    llm = FakeLLM();  cache()
+    assert fix(llm, "x = 1") == fix(llm, "x = 1", title="moved", path="b.py", diff="@@ -9 +9 @@")
+    m.SECTIONS.save();  cache()
+    assert fix(llm, "x = 1", diff="other") == "```suggestion\nfix1\n```"
+    assert llm.calls == 1
+    assert "fix1" not in (tmp_path / "sections.json").read_text()   # the answer is stored once, under llm/
+
+def test_model_is_part_of_the_key(cache, monkeypatch):
+    llm = FakeLLM();  cache();  fix(llm, "x = 1")
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT", "gpt-b")
+    fix(llm, "x = 1")
+    assert llm.calls == 2
+
+def test_promoted_to_hot_after_three_uses(cache):
+    llm = FakeLLM();  cache();  fix(llm, "x = 1");  m.SECTIONS.save()
+    c = cache();  key = m.SectionCache.key("SPEC", "\0x = 1\0")
+    assert c.get(key) and key not in c.hot                 # carried-over count was halved to 0: 1 use
+    assert c.get(key) and key not in c.hot
+    assert c.get(key) and key in c.hot
+
+def test_expired_or_pruned_answers_are_misses(cache, tmp_path):
+    llm = FakeLLM();  cache();  fix(llm, "x = 1");  fix(llm, "y = 2");  m.SECTIONS.save()
+    warm = json.loads((tmp_path / "sections.json").read_text())
+    kx, ky = m.SectionCache.key("SPEC", "\0x = 1\0"), m.SectionCache.key("SPEC", "\0y = 2\0")
+    warm[kx]["ts"] = time.time() - m.LLM_CACHE_TTL - 1
+    (tmp_path / "sections.json").write_text(json.dumps(warm))
+    (tmp_path / "llm" / f"{warm[ky]['ref']}.json").unlink()
+    c = cache()
+    assert c.get(kx) is None and c.get(ky) is None and c.warm == {}
+
+def test_save_ages_counts_and_evicts_least_used(cache, tmp_path):
+    c = cache();  c.warm_size = 2;  now = time.time()
+    c.warm = {"a": {"ref": "r", "hits": 9, "ts": now - 30}, "b": {"ref": "r", "hits": 2, "ts": now - 20},
+              "c": {"ref": "r", "hits": 3, "ts": now - 10}, "old": {"ref": "r", "hits": 99, "ts": now - m.LLM_CACHE_TTL - 1}}
+    c.save()
+    saved = json.loads((tmp_path / "sections.json").read_text())
+    assert list(saved) == ["a", "c"]                       # "old" expired; b and c tie at 1 after halving, c is newer
+    assert [e["hits"] for e in saved.values()] == [4, 1]
+
+def test_entries_from_the_old_layout_are_ignored(cache, tmp_path):
+    (tmp_path / "sections.json").write_text(json.dumps({"k": {"content": "stale", "hits": 5}}))
+    assert cache().get("k") is None
@@ -0,0 +1,24 @@
+# _strip_html(): single str.find pass over Confluence storage HTML
+from review_bot.main import _strip_html
+
+def test_paragraphs_and_breaks_become_newlines():
+    assert _strip_html("<p>a</p><p>b</p>") == "a\nb"
+    assert _strip_html("a</P>b") == "a\nb"
+    assert _strip_html("x<br>y<br/>z<BR >w") == "x\ny\nz\nw"
+
+def test_other_tags_are_dropped():
+    assert _strip_html('<div class="x">t</div>') == "t"
+    assert _strip_html("x<br //>y") == "xy"
+
+def test_entities_are_unescaped_after_stripping():
+    assert _strip_html("a &amp; b &lt;p&gt;") == "a & b <p>"
+
+def test_empty_brackets_and_unterminated_tags_stay_text():
+    assert _strip_html("a<>b") == "a<>b"
+    assert _strip_html("a<b") == "a<b"
+
+def test_malformed_tag_runs_to_the_first_close():
+    # "<a </p>" is one tag ending at the first '>' and is dropped whole
+    # (the old regex chain turned the "</p>" inside it into a newline first)
+    assert _strip_html("<a </p>") == ""
+    assert _strip_html("x<a </p>y") == "xy"